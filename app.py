@@ -1,18 +1,36 @@
+import os
+import warnings
+
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import pycountry
 from plotly.subplots import make_subplots
-from dash import Dash, dcc, html, Input, Output, ctx
+from dash import Dash, dcc, html, Input, Output, State, ctx
+from flask_caching import Cache
 
 # =========================================================
 # 1. LOAD + PREP DATA
 # =========================================================
+# The CSV location can be overridden with the RISK_CSV environment variable
+CSV_PATH = os.environ.get("RISK_CSV", "./output_EDA_analysis.csv")
+
 try:
-    df = pd.read_csv("/Users/rayyanahmad/Documents/Visulisation_Project/output_EDA_analysis.csv")
-except:
-    # Fallback for demonstration if file missing
-    print("Error: csv file not found.")
-    df = pd.DataFrame()
+    # Only load the columns the dashboard uses, with compact dtypes
+    df = pd.read_csv(CSV_PATH,
+                     usecols=["Country", "Year", "TEIS", "fatalities", "GDP_growth_pct"],
+                     dtype={"Country": "category",  # Dictionary-encode country names
+                            "Year": "int16", "fatalities": "int32",
+                            "TEIS": "float32", "GDP_growth_pct": "float32"})
+except FileNotFoundError:
+    # Fail fast: every precomputed aggregate below needs the data
+    raise SystemExit(f"Error: csv file not found at {CSV_PATH}")
+
+GLOBAL_VIEW = "Global View"
+
+# Presort so each country's rows are contiguous
+df = df.sort_values(["Country", "Year"], ignore_index=True)
 
 # Precompute global aggregates
 global_fatalities = df["fatalities"].sum()
@@ -22,16 +40,107 @@ global_trend = df.groupby("Year").agg(
     fatalities=("fatalities", "sum")
 ).reset_index()
 
+# Precompute per-country aggregates so clicks are simple lookups
+country_year = df.groupby(["Country", "Year"], observed=True).agg(
+    TEIS=("TEIS", "mean"),
+    fatalities=("fatalities", "sum")
+).reset_index()
+country_trend = {
+    country: sub[["Year", "TEIS", "fatalities"]].reset_index(drop=True)
+    for country, sub in country_year.groupby("Country", observed=True, sort=False)
+}
+country_fatalities = df.groupby("Country", observed=True, sort=False)["fatalities"].sum()
+country_teis = df.groupby("Country", observed=True, sort=False)["TEIS"].mean()
+
+# Preformatted KPI strings, so no number formatting happens per click
+kpi_fat_str = {country: f"{value:,.0f}" for country, value in country_fatalities.items()}
+kpi_teis_str = {country: f"{value:.3f}" for country, value in country_teis.items()}
+kpi_fat_str[GLOBAL_VIEW] = f"{global_fatalities:,.0f}"
+kpi_teis_str[GLOBAL_VIEW] = f"{global_teisc:.3f}"
+
+# Row range [start, stop) of each country in the presorted frame (used by the scatter highlight)
+country_rows = {
+    country: [int(rows[0]), int(rows[-1]) + 1]
+    for country, rows in df.groupby("Country", observed=True).indices.items()
+}
+
 # Precompute The Structural Drag (Regression Line) for the Scatter
-# We calculate the OLS line coordinates once using Plotly Express
-try:
-    trendline_fig = px.scatter(df, x="TEIS", y="GDP_growth_pct", trendline="ols")
-    trendline_trace = trendline_fig.data[1]  # Extract the OLS line trace
-    trendline_trace.line.color = 'red'
-    trendline_trace.line.dash = 'dash'
-    trendline_trace.name = 'Structural Drag (Global)'
-except:
-    trendline_trace = go.Scatter() # Empty fallback if statsmodels missing
+# We fit the OLS line once with a degree-1 least-squares fit (no statsmodels needed)
+teis_x = df["TEIS"].to_numpy(np.float32)
+growth_y = df["GDP_growth_pct"].to_numpy(np.float32)
+valid = ~(np.isnan(teis_x) | np.isnan(growth_y))
+slope, intercept = np.polyfit(teis_x[valid], growth_y[valid], 1)
+trendline_x = np.array([teis_x[valid].min(), teis_x[valid].max()])
+trendline_trace = go.Scatter(x=trendline_x, y=slope * trendline_x + intercept, mode="lines",
+                             line=dict(color="red", dash="dash"), name="Structural Drag (Global)")
+
+# Precompute the Choropleth Map
+# The map does not depend on the selection, so we build it once here
+# Countries are located by ISO-3 code, which avoids Plotly's fuzzy country-name matching
+# We use uirevision to prevent map from resetting zoom on click
+NAME_TO_ISO3 = {}
+for country in pycountry.countries:
+    # Match the formal, common ("Iran") and official names of each ISO 3166 entry
+    for name in (country.name, getattr(country, "common_name", None), getattr(country, "official_name", None)):
+        if name:
+            NAME_TO_ISO3.setdefault(name, country.alpha_3)
+NAME_TO_ISO3.update({
+    # Dataset names that differ from the ISO 3166 names
+    "Bosnia-Herzegovina": "BIH", "Brunei": "BRN", "Czech Republic": "CZE",
+    "Democratic Republic of the Congo": "COD", "East Timor": "TLS", "Falkland Islands": "FLK",
+    "Ivory Coast": "CIV", "Kosovo": "XKX", "Macau": "MAC", "Macedonia": "MKD",
+    "Republic of the Congo": "COG", "Russia": "RUS", "Slovak Republic": "SVK",
+    "St. Kitts and Nevis": "KNA", "St. Lucia": "LCA", "Swaziland": "SWZ", "Turkey": "TUR",
+    "Vatican City": "VAT", "West Bank and Gaza Strip": "PSE",
+})
+# Historical states (and non-country entries) have no polygon of their own, so they stay off the map
+# rather than drawing over their modern successor
+UNMAPPED_NAMES = {
+    "Czechoslovakia", "East Germany (GDR)", "International", "New Hebrides", "North Yemen",
+    "People's Republic of the Congo", "Rhodesia", "Serbia-Montenegro", "South Yemen",
+    "Soviet Union", "West Germany (FRG)", "Yugoslavia", "Zaire",
+}
+map_agg = country_teis.reset_index()
+map_agg["iso3"] = map_agg["Country"].astype(str).map(NAME_TO_ISO3)
+dropped = set(map_agg.loc[map_agg["iso3"].isna(), "Country"].astype(str)) - UNMAPPED_NAMES
+if dropped:
+    # Unknown names are reported and left off the map rather than blocking startup
+    warnings.warn(f"No ISO-3 code for countries: {sorted(dropped)}")
+map_agg = map_agg.dropna(subset=["iso3"])
+# The dataset country name travels in customdata so clicks can look it up directly
+map_fig = px.choropleth(map_agg, locations="iso3", locationmode="ISO-3", color="TEIS",
+                        color_continuous_scale="Reds", hover_name="Country", custom_data=["Country"])
+map_fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), uirevision='constant',
+                      geo=dict(showframe=False, showcoastlines=False, projection_type='equirectangular'))
+
+# Precompute the Scatter Base Figure
+# x/y/text never change, so only the marker colours are updated per click
+scatter_base_fig = go.Figure()
+# A. Add the Regression Line (Structural Drag) - ALWAYS VISIBLE (index 0)
+scatter_base_fig.add_trace(trendline_trace)
+# B. Add the Points (index 1)
+# Rendered with WebGL, so recolouring is a buffer upload rather than one SVG node per point
+# Marker colour is a small int state mapped through the colorscale: 0=default, 1=dimmed, 2=highlighted
+scatter_base_fig.add_trace(go.Scattergl(
+    x=df["TEIS"].to_numpy(), y=df["GDP_growth_pct"].to_numpy(), mode="markers",
+    marker=dict(size=8, color=np.zeros(len(df), dtype=np.int8), opacity=0.6,
+                cmin=0, cmax=2, showscale=False,
+                colorscale=[[0.0, "steelblue"], [0.5, "lightgrey"], [1.0, "red"]]),
+    text=df["Country"].to_numpy(), name="Countries"
+))
+scatter_base_fig.update_layout(xaxis_title="Risk Intensity (TEIS)", yaxis_title="GDP Growth (%)",
+                               margin=dict(l=0, r=0, t=10, b=0), plot_bgcolor="white", showlegend=False)
+scatter_base_fig.update_xaxes(showgrid=True, gridcolor="#f0f0f0")
+scatter_base_fig.update_yaxes(showgrid=True, gridcolor="#f0f0f0")
+
+# Precompute the Trend Template Figure
+# Layout and axes are fixed, so only the trace data is filled in per selection
+trend_template_fig = make_subplots(specs=[[{"secondary_y": True}]])
+trend_template_fig.add_trace(go.Bar(x=[], y=[], name="Fatalities", marker_color="#bdc3c7", opacity=0.7), secondary_y=False)
+trend_template_fig.add_trace(go.Scatter(x=[], y=[], name="TEIS Intensity", line=dict(color="#27ae60", width=3)), secondary_y=True)
+trend_template_fig.update_layout(margin=dict(l=0, r=0, t=10, b=0), legend=dict(orientation="h", y=1.1, x=0.5, xanchor="center"), plot_bgcolor="white")
+trend_template_fig.update_yaxes(title_text="Fatalities", secondary_y=False, showgrid=False)
+trend_template_fig.update_yaxes(title_text="TEIS Index", secondary_y=True, showgrid=False)
 
 # =========================================================
 # 2. DASH APPLICATION (HD DESIGN WITH INJECTED CSS)
@@ -39,6 +148,9 @@ except:
 app = Dash(__name__)
 server = app.server
 
+# In-memory cache for per-country results (swap CACHE_TYPE to "RedisCache" when deploying)
+cache = Cache(server, config={"CACHE_TYPE": "SimpleCache", "CACHE_DEFAULT_TIMEOUT": 3600})
+
 # Professional CSS Styling (Injected directly so you don't need a CSS file)
 app.index_string = '''
 <!DOCTYPE html>
@@ -83,15 +195,15 @@ app.layout = html.Div([
     # ---------------- KPI ROW ----------------
     html.Div([
         html.Div([html.H4("Selected Region", style={"color": "#95a5a6", "margin": 0}), 
-                  html.H2(id="kpi-country", children="Global View", style={"color": "#2c3e50", "margin": "10px 0"})], 
+                  html.H2(id="kpi-country", children=GLOBAL_VIEW, style={"color": "#2c3e50", "margin": "10px 0"})], 
                   className="kpi-box", style={"borderTopColor": "#2c3e50"}),
         
         html.Div([html.H4("Total Fatalities", style={"color": "#95a5a6", "margin": 0}), 
-                  html.H2(id="kpi-fatalities", children=f"{global_fatalities:,.0f}", style={"color": "#c0392b", "margin": "10px 0"})], 
+                  html.H2(id="kpi-fatalities", children=kpi_fat_str[GLOBAL_VIEW], style={"color": "#c0392b", "margin": "10px 0"})], 
                   className="kpi-box", style={"borderTopColor": "#c0392b"}),
         
         html.Div([html.H4("Avg Risk Intensity (TEIS)", style={"color": "#95a5a6", "margin": 0}), 
-                  html.H2(id="kpi-teis", children=f"{global_teisc:.3f}", style={"color": "#27ae60", "margin": "10px 0"})], 
+                  html.H2(id="kpi-teis", children=kpi_teis_str[GLOBAL_VIEW], style={"color": "#27ae60", "margin": "10px 0"})], 
                   className="kpi-box", style={"borderTopColor": "#27ae60"}),
     ], className="kpi-container"),
 
@@ -99,7 +211,7 @@ app.layout = html.Div([
     html.Div([
         html.Div([
             html.H3("1. Spatial Risk Concentration", style={"color": "#2c3e50", "marginTop": 0}),
-            dcc.Graph(id="map-chart", style={"height": "350px"})
+            dcc.Graph(id="map-chart", figure=map_fig, style={"height": "350px"})
         ], className="viz-box"),
 
         html.Div([
@@ -113,7 +225,8 @@ app.layout = html.Div([
         html.Div([
             html.H3("3. Statistical Validation: The 'Structural Drag'", style={"color": "#2c3e50", "marginTop": 0}),
             html.P("Red Dashed Line = Global Growth Ceiling (Regression Model)", style={"fontSize": "12px", "color": "red"}),
-            dcc.Graph(id="scatter-chart", style={"height": "400px"})
+            dcc.Graph(id="scatter-chart", figure=scatter_base_fig, style={"height": "400px"}),
+            dcc.Store(id="country-rows", data=country_rows)
         ], className="viz-box")
     ], className="viz-container", style={"paddingBottom": "40px"})
 
@@ -122,10 +235,40 @@ app.layout = html.Div([
 # =========================================================
 # 3. INTERACTIVITY
 # =========================================================
+# Per-selection outputs are memoized, so repeat selections skip the rebuild
+@cache.memoize()
+def build_for_country(selected_country):
+
+    # DEFAULT / RESET STATE
+    if selected_country == GLOBAL_VIEW:
+        trend_df = global_trend
+        
+    # FILTERED STATE
+    else:
+        # Lookup precomputed country trend (fallback to global trend if no data)
+        trend_df = country_trend.get(selected_country, global_trend)
+
+    # Lookup preformatted KPIs (zero if the country has no data)
+    kpi_fat = kpi_fat_str.get(selected_country, "0")
+    kpi_teis = kpi_teis_str.get(selected_country, "0.000")
+
+    # --- 2. BUILD TREND ---
+    # Copy the precomputed template and only fill in the trace data
+    years = trend_df["Year"].to_numpy()
+    fat_arr = trend_df["fatalities"].to_numpy()
+    teis_arr = trend_df["TEIS"].to_numpy()
+    fig_trend = go.Figure(trend_template_fig)
+    fig_trend.data[0].x = years
+    fig_trend.data[0].y = fat_arr
+    fig_trend.data[1].x = years
+    fig_trend.data[1].y = teis_arr
+
+    return fig_trend.to_dict(), kpi_fat, kpi_teis
+
 @app.callback(
-    [Output("map-chart", "figure"),
-     Output("trend-chart", "figure"),
-     Output("scatter-chart", "figure"),
+    # The map is static and already in the layout, so it is serialized once per session
+    # and is not an output here
+    [Output("trend-chart", "figure"),
      Output("kpi-country", "children"),
      Output("kpi-fatalities", "children"),
      Output("kpi-teis", "children")],
@@ -139,85 +282,44 @@ def update_dashboard(clickData, n_clicks):
     
     # DEFAULT / RESET STATE
     if not clickData or triggered_id == "btn-reset":
-        selected_country = "Global View"
-        trend_df = global_trend
-        kpi_fat = global_fatalities
-        kpi_teis = global_teisc
-        
-        # Default Scatter: All points steelblue
-        scatter_colors = ["steelblue"] * len(df)
-        scatter_opacity = [0.6] * len(df)
-        
+        selected_country = GLOBAL_VIEW
     # FILTERED STATE
     else:
-        selected_country = clickData["points"][0]["location"]
-        df_filtered = df[df["Country"] == selected_country]
-        
-        # Check if country has data
-        if df_filtered.empty:
-            trend_df = global_trend # Fallback
-        else:
-            trend_df = df_filtered.groupby("Year").agg(
-                TEIS=("TEIS", "mean"), fatalities=("fatalities", "sum")
-            ).reset_index()
-            
-        kpi_fat = df_filtered["fatalities"].sum()
-        kpi_teis = df_filtered["TEIS"].mean()
-        
-        # Scatter Benchmarking Logic: Grey out world, highlight country in Red
-        scatter_colors = ["lightgrey"] * len(df)
-        scatter_opacity = [0.3] * len(df)
-        for idx in df.index[df["Country"] == selected_country]:
-            scatter_colors[idx] = "red"
-            scatter_opacity[idx] = 1.0
-
-    # --- 1. BUILD MAP ---
-    # We use uirevision to prevent map from resetting zoom on click
-    map_agg = df.groupby("Country")["TEIS"].mean().reset_index()
-    fig_map = px.choropleth(map_agg, locations="Country", locationmode="country names",
-                            color="TEIS", color_continuous_scale="Reds")
-    fig_map.update_layout(margin=dict(l=0, r=0, t=0, b=0), uirevision='constant', 
-                         geo=dict(showframe=False, showcoastlines=False, projection_type='equirectangular'))
+        selected_country = clickData["points"][0]["customdata"][0]
 
-    # --- 2. BUILD TREND ---
-    fig_trend = make_subplots(specs=[[{"secondary_y": True}]])
-    fig_trend.add_trace(go.Bar(x=trend_df["Year"], y=trend_df["fatalities"], name="Fatalities", marker_color="#bdc3c7", opacity=0.7), secondary_y=False)
-    fig_trend.add_trace(go.Scatter(x=trend_df["Year"], y=trend_df["TEIS"], name="TEIS Intensity", line=dict(color="#27ae60", width=3)), secondary_y=True)
-    fig_trend.update_layout(margin=dict(l=0, r=0, t=10, b=0), legend=dict(orientation="h", y=1.1, x=0.5, xanchor="center"), plot_bgcolor="white")
-    fig_trend.update_yaxes(title_text="Fatalities", secondary_y=False, showgrid=False)
-    fig_trend.update_yaxes(title_text="TEIS Index", secondary_y=True, showgrid=False)
-
-    # --- 3. BUILD SCATTER ---
-    fig_scatter = go.Figure()
-    # A. Add the Regression Line (Structural Drag) - ALWAYS VISIBLE
-    if trendline_trace:
-        fig_scatter.add_trace(trendline_trace)
-    # B. Add the Points
-    fig_scatter.add_trace(go.Scatter(
-        x=df["TEIS"], y=df["GDP_growth_pct"], mode="markers",
-        marker=dict(size=8, color=scatter_colors, opacity=scatter_opacity),
-        text=df["Country"], name="Countries"
-    ))
-    fig_scatter.update_layout(xaxis_title="Risk Intensity (TEIS)", yaxis_title="GDP Growth (%)",
-                              margin=dict(l=0, r=0, t=10, b=0), plot_bgcolor="white", showlegend=False)
-    fig_scatter.update_xaxes(showgrid=True, gridcolor="#f0f0f0")
-    fig_scatter.update_yaxes(showgrid=True, gridcolor="#f0f0f0")
-
-    return fig_map, fig_trend, fig_scatter, selected_country, f"{kpi_fat:,.0f}", f"{kpi_teis:.3f}"
+    fig_trend, kpi_fat, kpi_teis = build_for_country(selected_country)
 
-if __name__ == "__main__":
-    app.run(debug=True, port=8050)
+    return fig_trend, selected_country, kpi_fat, kpi_teis
 
+# Scatter Benchmarking Logic runs in the browser: grey out world, highlight country in red
+# The precomputed row range of each country means only the highlighted rows are touched per click
+app.clientside_callback(
+    """
+    function(clickData, n_clicks, fig, countryRows) {
+        const triggered = dash_clientside.callback_context.triggered.map(t => t.prop_id);
+        const sel = (clickData && !triggered.includes("btn-reset.n_clicks"))
+            ? clickData.points[0].customdata[0] : null;
+        const points = fig.data[1];
+        const n = points.text.length;
+        const colors = new Array(n).fill(sel !== null ? 1 : 0);
+        const opacity = new Array(n).fill(sel !== null ? 0.3 : 0.6);
+        const rows = sel !== null ? countryRows[sel] : undefined;
+        if (rows) {
+            for (let i = rows[0]; i < rows[1]; i++) {
+                colors[i] = 2;
+                opacity[i] = 1.0;
+            }
+        }
+        const marker = Object.assign({}, points.marker, {color: colors, opacity: opacity});
+        return Object.assign({}, fig, {data: [fig.data[0], Object.assign({}, points, {marker: marker})]});
+    }
+    """,
+    Output("scatter-chart", "figure"),
+    [Input("map-chart", "clickData"),
+     Input("btn-reset", "n_clicks")],
+    [State("scatter-chart", "figure"),
+     State("country-rows", "data")]
+)
 
-    #### Code: Context-Preserving Highlight Logic
-@app.callback(...)
-def update_dashboard(clickData):
-    if selected_country:
-        #### Baseline (global context)
-        scatter_colors = ["lightgrey"] * len(df)
-        scatter_opacity = [0.3] * len(df)
-        
-        #### Highlight selected region without removing global data
-        for idx in df.index[df["Country"] == selected_country]:
-            scatter_colors[idx] = "red"
-            scatter_opacity[idx] = 1.0
+if __name__ == "__main__":
+    app.run(debug=True, port=8050)